@@ -1,73 +1,530 @@
+import base64
+import bisect
+import codecs
+import functools
+import json
 import os
 import re
 import socket
 import sys
 import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from itertools import chain
 
-import pysrt
 from termcolor import colored
 
 SEARCH_LIMIT = 12
+SUBS_CACHE_SIZE = 512
+RESULT_CACHE_SIZE = 256
+SEND_BUFFER_SIZE = 64 * 1024
+LANG_SUFFIXES = ("en", "ru")
+INDEX_REFRESH_INTERVAL = 60  # seconds
+# Each connected client holds a worker for its whole session
+MAX_CLIENTS = 256
+TEXT_INDEX_FILE = ".reverso_index.json"
+TEXT_INDEX_VERSION = 5
+TRIGRAM_SIZE = 3
+TEXT_SEPARATOR = b"\0"
+RESULT_SEPARATOR = "-" * 80
+
+# Checked longest first: the UTF-32 LE BOM starts with the UTF-16 LE one
+_SRT_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+)
+_TIMESTAMP_RE = re.compile(
+    r"\s*((\d+):(\d+):(\d+)[,.](\d+))\s*-->\s*((\d+):(\d+):(\d+)[,.](\d+))"
+)
+_WHITESPACE_RE = re.compile(r"[ \n]+")
+_ITALIC_TAG_RE = re.compile(r"</?i>")
+
+# Subtitles in file order; blob holds their lowercased UTF-8 texts joined by
+# TEXT_SEPARATOR, with offsets[i] the start of subtitle i (plus a final end).
+# sorted_starts_ms is starts_ms sorted, start_order[k] the position behind it.
+_SubsEntry = namedtuple(
+    "_SubsEntry",
+    "stat_key starts_ms ends_ms starts_str ends_str texts blob offsets "
+    "sorted_starts_ms start_order",
+)
+
+# path -> _SubsEntry, most recently used last
+_SUBS_CACHE = OrderedDict()
+_SUBS_CACHE_LOCK = threading.Lock()
+
+# (directory, index generation, search language, lowercased query) -> response
+#
+# Searches see the corpus as of the last index refresh: the file list, the
+# trigram index and these cached responses all change only when
+# _refresh_subtitle_index runs, so edits to subtitle files can take up to
+# INDEX_REFRESH_INTERVAL seconds to show up in results and translations.
+_RESULT_CACHE = OrderedDict()
+_RESULT_CACHE_LOCK = threading.Lock()
 
 
-def to_timedelta(srt_time):
-    return timedelta(
-        hours=srt_time.hours,
-        minutes=srt_time.minutes,
-        seconds=srt_time.seconds,
-        milliseconds=srt_time.milliseconds,
+def is_russian(text):
+    return not text.isascii()  # Any non-ASCII character
+
+
+def _lower_utf8(data):
+    # bytes.lower() only folds ASCII letters
+    if data.isascii():
+        return data.lower()
+    return data.decode().lower().encode()
+
+
+def _srt_time_to_ms(hours, minutes, seconds, milliseconds):
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + milliseconds
+
+
+def _format_srt_time(ms):
+    seconds, milliseconds = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def _parse_srt_time(raw, hours, minutes, seconds, milliseconds):
+    minutes = int(minutes)
+    seconds = int(seconds)
+    ms = _srt_time_to_ms(int(hours), minutes, seconds, int(milliseconds))
+
+    # Well-formed HH:MM:SS,mmm timecodes are displayed exactly as written
+    if (
+        len(raw) == 12
+        and raw[2] == ":"
+        and raw[5] == ":"
+        and raw[8] == ","
+        and minutes < 60
+        and seconds < 60
+    ):
+        return ms, raw
+    return ms, _format_srt_time(ms)
+
+
+def _decode_srt(raw):
+    for bom, encoding in _SRT_BOMS:
+        if raw.startswith(bom):
+            return raw[len(bom) :].decode(encoding)
+    return raw.decode("utf-8")
+
+
+def parse_srt(file_path):
+    with open(file_path, "rb") as f:
+        source = _decode_srt(f.read())
+
+    starts_ms = array("i")
+    ends_ms = array("i")
+    starts_str = []
+    ends_str = []
+    texts = []
+
+    # Blocks are separated by blank lines; the leading index line is optional
+    # and blocks without a valid timestamp line are skipped
+    block = []
+    for line in chain(source.splitlines(), [""]):
+        if line.strip():
+            block.append(line.rstrip())
+            continue
+
+        if len(block) >= 2:
+            if "-->" not in block[0]:
+                del block[0]
+            match = _TIMESTAMP_RE.match(block[0])
+            if match:
+                groups = match.groups()
+                start_ms, start_str = _parse_srt_time(*groups[:5])
+                end_ms, end_str = _parse_srt_time(*groups[5:])
+                starts_ms.append(start_ms)
+                ends_ms.append(end_ms)
+                starts_str.append(start_str)
+                ends_str.append(end_str)
+                texts.append("\n".join(block[1:]))
+        block = []
+
+    return starts_ms, ends_ms, starts_str, ends_str, texts
+
+
+def _index_subs(starts_ms):
+    start_order = array("I", sorted(range(len(starts_ms)), key=starts_ms.__getitem__))
+    return array("i", (starts_ms[i] for i in start_order)), start_order
+
+
+def _build_text_blob(texts):
+    encoded_texts = [text.lower().encode() for text in texts]
+    offsets = array("I", [0])
+    for encoded_text in encoded_texts:
+        offsets.append(offsets[-1] + len(encoded_text) + len(TEXT_SEPARATOR))
+    return TEXT_SEPARATOR.join(encoded_texts), offsets
+
+
+def _find_in_blob(blob, offsets, needle, positions=None, limit=None):
+    matches = []
+    if positions is not None:
+        for position in positions:
+            segment_end = offsets[position + 1] - len(TEXT_SEPARATOR)
+            if blob.find(needle, offsets[position], segment_end) != -1:
+                matches.append(position)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    # One C-level scan over the whole file instead of a Python loop per sub
+    found = blob.find(needle)
+    while found != -1:
+        position = bisect.bisect_right(offsets, found) - 1
+        next_start = offsets[position + 1]
+        if found + len(needle) <= next_start - len(TEXT_SEPARATOR):
+            matches.append(position)
+            if len(matches) == limit:
+                break
+            found = blob.find(needle, next_start)
+        else:
+            # The hit straddles a separator; retry just past its start
+            found = blob.find(needle, found + 1)
+    return matches
+
+
+def _stat_key(file_path):
+    # mtime alone misses files replaced with their timestamp preserved
+    st = os.stat(file_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_subs(file_path):
+    stat_key = _stat_key(file_path)
+
+    with _SUBS_CACHE_LOCK:
+        cached = _SUBS_CACHE.get(file_path)
+        if cached and cached.stat_key == stat_key:
+            _SUBS_CACHE.move_to_end(file_path)
+            return cached
+
+    # Parse outside the lock so other clients are not blocked on disk I/O
+    starts_ms, ends_ms, starts_str, ends_str, texts = parse_srt(file_path)
+    blob, offsets = _build_text_blob(texts)
+    sorted_starts_ms, start_order = _index_subs(starts_ms)
+
+    loaded = _SubsEntry(
+        stat_key,
+        starts_ms,
+        ends_ms,
+        starts_str,
+        ends_str,
+        texts,
+        blob,
+        offsets,
+        sorted_starts_ms,
+        start_order,
     )
+    with _SUBS_CACHE_LOCK:
+        _SUBS_CACHE[file_path] = loaded
+        _SUBS_CACHE.move_to_end(file_path)
+        while len(_SUBS_CACHE) > SUBS_CACHE_SIZE:
+            _SUBS_CACHE.popitem(last=False)
+
+    return loaded
+
+
+def _trigrams(data):
+    return {
+        int.from_bytes(data[i : i + TRIGRAM_SIZE], "big")
+        for i in range(len(data) - TRIGRAM_SIZE + 1)
+    }
+
+
+def _pack_postings(postings):
+    # One sorted key array, an offset table and one flat value array, rather
+    # than a dict holding a separate array per trigram
+    trigrams = array("I", sorted(postings))
+    offsets = array("I", [0])
+    values = array("I")
+    for trigram in trigrams:
+        values.extend(postings[trigram])
+        offsets.append(len(values))
+    return trigrams, offsets, values
+
+
+def _build_trigram_postings(blob, offsets):
+    postings = {}
+    for position in range(len(offsets) - 1):
+        segment_end = offsets[position + 1] - len(TEXT_SEPARATOR)
+        for trigram in _trigrams(blob[offsets[position] : segment_end]):
+            posting = postings.get(trigram)
+            if posting is None:
+                posting = postings[trigram] = []
+            posting.append(position)
+    return _pack_postings(postings)
+
+
+def _build_trigram_file_map(text_index):
+    file_paths = list(text_index)
+    postings = {}
+    for file_id, (_, (trigrams, _, _)) in enumerate(text_index.values()):
+        for trigram in trigrams:
+            posting = postings.get(trigram)
+            if posting is None:
+                posting = postings[trigram] = []
+            posting.append(file_id)
+    return file_paths, _pack_postings(postings)
+
+
+def _trigram_candidates(packed_postings, needle):
+    trigrams, offsets, values = packed_postings
+    posting_lists = []
+    for trigram in _trigrams(needle):
+        i = bisect.bisect_left(trigrams, trigram)
+        if i == len(trigrams) or trigrams[i] != trigram:
+            return []
+        posting_lists.append(values[offsets[i] : offsets[i + 1]])
+
+    # Start from the rarest trigram so the candidate set only shrinks
+    posting_lists.sort(key=len)
+    candidates = set(posting_lists[0])
+    for posting in posting_lists[1:]:
+        candidates.intersection_update(posting)
+        if not candidates:
+            return []
+    return sorted(candidates)
+
+
+def build_text_index(file_paths, previous=None):
+    previous = previous or {}
+    text_index = {}
+    for file_path in file_paths:
+        try:
+            entry = previous.get(file_path)
+            if entry is None or entry[0] != _stat_key(file_path):
+                loaded = _load_subs(file_path)
+                postings = _build_trigram_postings(loaded.blob, loaded.offsets)
+                entry = (loaded.stat_key, postings)
+            text_index[file_path] = entry
+        except Exception as e:
+            print(f"Error indexing file {file_path}: {e}")
+    return text_index
+
+
+def _encode_array(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return base64.b64encode(zlib.compress(values.tobytes())).decode("ascii")
+
+
+def _decode_array(data):
+    values = array("I")
+    values.frombytes(zlib.decompress(base64.b64decode(data, validate=True)))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def load_text_index(path):
+    # Plain JSON, so a file dropped into the subtitles directory is only data
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != TEXT_INDEX_VERSION:
+            # Indexes written by an older layout are rebuilt from scratch
+            return {}
+
+        text_index = {}
+        for file_path, (stat_key, *packed) in data["files"].items():
+            trigrams, offsets, values = (_decode_array(part) for part in packed)
+            if len(offsets) != len(trigrams) + 1 or offsets[-1] != len(values):
+                raise ValueError(f"inconsistent postings for {file_path}")
+            mtime_ns, size = stat_key
+            text_index[file_path] = (
+                (int(mtime_ns), int(size)),
+                (trigrams, offsets, values),
+            )
+        return text_index
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"[ERROR] Failed to load text index {path}: {e}")
+        return {}
+
+
+def save_text_index(text_index, path):
+    data = {
+        "version": TEXT_INDEX_VERSION,
+        "files": {
+            file_path: [list(stat_key)] + [_encode_array(part) for part in packed]
+            for file_path, (stat_key, packed) in text_index.items()
+        },
+    }
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+    except OSError as e:
+        print(f"[ERROR] Failed to save text index {path}: {e}")
 
 
-def is_russian(text):
-    return bool(re.search(r"[^\x00-\x7F]", text))  # Any non-ASCII character
-
+def find_closest_sub(
+    start_ms, starts_ms, tolerance=timedelta(seconds=1), start_order=None
+):
+    tolerance_ms = tolerance // timedelta(milliseconds=1)
+
+    # Nothing can be in range when the target lies outside the file's span
+    if (
+        not starts_ms
+        or start_ms < starts_ms[0] - tolerance_ms
+        or start_ms > starts_ms[-1] + tolerance_ms
+    ):
+        return None
+
+    closest_position = None
+    min_time_diff = None
+
+    # Only the neighbours around the insertion point can be the nearest start
+    i = bisect.bisect_left(starts_ms, start_ms)
+    for j in (i - 1, i):
+        if 0 <= j < len(starts_ms):
+            time_diff = abs(starts_ms[j] - start_ms)
+            if time_diff <= tolerance_ms and (
+                min_time_diff is None or time_diff < min_time_diff
+            ):
+                min_time_diff = time_diff
+                closest_position = j
+
+    if closest_position is None or start_order is None:
+        return closest_position
+
+    # Among equally close starts, prefer the subtitle that comes first in the
+    # file, as a linear scan over the file would
+    positions = []
+    for value in {start_ms - min_time_diff, start_ms + min_time_diff}:
+        k = bisect.bisect_left(starts_ms, value)
+        while k < len(starts_ms) and starts_ms[k] == value:
+            positions.append(start_order[k])
+            k += 1
+    return min(positions)
+
+
+def _other_lang_file_path(file_path, from_lang_suffix, to_lang_suffix):
+    directory_path = os.path.dirname(file_path)
+    file_name = os.path.basename(file_path)
 
-def find_closest_sub(start_time, subs, tolerance=timedelta(seconds=1)):
-    closest_sub = None
-    min_time_diff = timedelta.max
+    other_lang_file_name = file_name.replace(
+        f"_{from_lang_suffix}", f"_{to_lang_suffix}"
+    )
+    return os.path.join(directory_path, other_lang_file_name)
 
-    start_time_td = to_timedelta(start_time)
 
-    for sub in subs:
-        sub_start_time_td = to_timedelta(
-            sub.start
+def _walk_srt(root, suffixes):
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+
+    # Files before subdirectories, matching os.walk's top-down order
+    subdirs = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+        elif entry.name.endswith(suffixes) and entry.is_file():
+            yield entry.path
+
+    for subdir in subdirs:
+        yield from _walk_srt(subdir, suffixes)
+
+
+def build_subtitle_index(directory, previous=None, with_text_index=False):
+    files = {lang_suffix: [] for lang_suffix in LANG_SUFFIXES}
+    suffixes = tuple(f"_{lang_suffix}.srt" for lang_suffix in LANG_SUFFIXES)
+    for file_path in _walk_srt(directory, suffixes):
+        for lang_suffix in LANG_SUFFIXES:
+            if file_path.endswith(f"_{lang_suffix}.srt"):
+                files[lang_suffix].append(file_path)
+
+    # Pair every file with its sibling in each other language up front
+    pairs = {}
+    for from_lang_suffix in LANG_SUFFIXES:
+        for to_lang_suffix in LANG_SUFFIXES:
+            if from_lang_suffix == to_lang_suffix:
+                continue
+            known_paths = set(files[to_lang_suffix])
+            for file_path in files[from_lang_suffix]:
+                other_lang_file_path = _other_lang_file_path(
+                    file_path, from_lang_suffix, to_lang_suffix
+                )
+                if other_lang_file_path in known_paths:
+                    pairs[(file_path, to_lang_suffix)] = other_lang_file_path
+
+    index = {"files": files, "pairs": pairs}
+    if with_text_index:
+        index["text"] = build_text_index(
+            [file_path for paths in files.values() for file_path in paths],
+            previous.get("text") if previous else None,
         )
-        time_diff = abs(sub_start_time_td - start_time_td)
-
-        if time_diff <= tolerance and time_diff < min_time_diff:
-            min_time_diff = time_diff
-            closest_sub = sub
-
-    return closest_sub
+        index["trigram_files"] = _build_trigram_file_map(index["text"])
+        # Bumped on every refresh that changes the text index; keys the
+        # result cache, so it must stay the last key written on update
+        index["generation"] = 0
+    return index
+
+
+def _refresh_subtitle_index(index, directory, interval, text_index_path):
+    while True:
+        time.sleep(interval)
+        try:
+            old_text_index = index["text"]
+            old_trigram_files = index["trigram_files"]
+            new_index = build_subtitle_index(directory, index, with_text_index=True)
+            new_text_index = new_index["text"]
+            if new_text_index.keys() != old_text_index.keys() or any(
+                entry is not old_text_index[file_path]
+                for file_path, entry in new_text_index.items()
+            ):
+                new_index["generation"] = index["generation"] + 1
+                index.update(new_index)
+                save_text_index(new_text_index, text_index_path)
+            else:
+                new_index["text"] = old_text_index
+                new_index["trigram_files"] = old_trigram_files
+                new_index["generation"] = index["generation"]
+                index.update(new_index)
+        except Exception as e:
+            print(f"[ERROR] Failed to refresh subtitle index: {e}")
 
 
 def find_translation_in_other_lang(
     directory,
-    start_time,
+    start_ms,
     file_path,
     from_lang_suffix,
     to_lang_suffix,
     tolerance=timedelta(seconds=1),
+    index=None,
 ):
-    directory_path = os.path.dirname(file_path)
-    file_name = os.path.basename(file_path)
-
-    other_lang_file_name = file_name.replace(
-        f"_{from_lang_suffix}", f"_{to_lang_suffix}"
-    )
-    other_lang_file_path = os.path.join(directory_path, other_lang_file_name)
+    if index is not None:
+        other_lang_file_path = index["pairs"].get((file_path, to_lang_suffix))
+    else:
+        other_lang_file_path = _other_lang_file_path(
+            file_path, from_lang_suffix, to_lang_suffix
+        )
+        if not os.path.exists(other_lang_file_path):
+            other_lang_file_path = None
 
-    if os.path.exists(other_lang_file_path):
-        subs = pysrt.open(other_lang_file_path)
+    if other_lang_file_path:
+        loaded = _load_subs(other_lang_file_path)
 
-        closest_sub = find_closest_sub(start_time, subs, tolerance)
-        if closest_sub:
+        closest_position = find_closest_sub(
+            start_ms, loaded.sorted_starts_ms, tolerance, loaded.start_order
+        )
+        if closest_position is not None:
             return (
-                closest_sub.text.strip(),
-                closest_sub.start,
-                closest_sub.end,
+                loaded.texts[closest_position].strip(),
+                loaded.starts_str[closest_position],
+                loaded.ends_str[closest_position],
                 other_lang_file_path,
             )
         else:
@@ -77,27 +534,177 @@ def find_translation_in_other_lang(
 
 
 def format_single_result(result):
-    formatted = []
     orig = result["original"]
-    formatted.append(
-        f"{orig['language']} ({orig['file']}) {orig['start_time']} -> {orig['end_time']}"
+    trans = result["translation"]
+    if trans:
+        trans_block = (
+            f"{trans['language']} ({trans['file']}) "
+            f"{trans['start_time']} -> {trans['end_time']}\n{trans['text']}"
+        )
+    else:
+        trans_block = "No corresponding translation found."
+
+    return (
+        f"{orig['language']} ({orig['file']}) "
+        f"{orig['start_time']} -> {orig['end_time']}\n{orig['text']}\n\n"
+        f"{trans_block}\n\n{RESULT_SEPARATOR}"
     )
-    formatted.append(f"{orig['text']}\n")
 
-    if result["translation"]:
-        trans = result["translation"]
-        formatted.append(
-            f"{trans['language']} ({trans['file']}) {trans['start_time']} -> {trans['end_time']}"
+
+def _clean_text(text):
+    text = text.strip()
+    # Most lines are single-spaced and untagged; skip the regexes for them
+    if "\n" in text or "  " in text:
+        text = _WHITESPACE_RE.sub(" ", text)
+    if "i>" in text:
+        text = _ITALIC_TAG_RE.sub("", text)
+    return text
+
+
+def _search_file(needle, file_path, index):
+    try:
+        text_entry = index.get("text", {}).get(file_path)
+        candidates = None
+        if text_entry is not None and len(needle) >= TRIGRAM_SIZE:
+            candidates = _trigram_candidates(text_entry[1], needle)
+            if not candidates:
+                return None, []
+
+        loaded = _load_subs(file_path)
+        if candidates is not None and loaded.stat_key != text_entry[0]:
+            # Positions from an older version of the file would be wrong
+            candidates = None
+        elif candidates is not None:
+            # Never index past the file, even if a replacement slipped through
+            candidates = candidates[: bisect.bisect_left(candidates, len(loaded.texts))]
+
+        positions = _find_in_blob(
+            loaded.blob, loaded.offsets, needle, candidates, SEARCH_LIMIT
         )
-        formatted.append(f"{trans['text']}\n")
+        return loaded, positions
+    except Exception as e:
+        print(f"Error processing file {file_path}: {e}")
+        return None, None
+
+
+def _build_result(
+    directory, file_path, loaded, position, lang_suffix, other_lang_suffix, index
+):
+    start_ms = loaded.starts_ms[position]
+    text = _clean_text(loaded.texts[position])
+
+    result = {
+        "original": {
+            "language": lang_suffix.upper(),
+            "file": file_path,
+            "start_time": loaded.starts_str[position],
+            "end_time": loaded.ends_str[position],
+            "text": text,
+        }
+    }
+
+    (
+        translated_text,
+        translated_start_time,
+        translated_end_time,
+        translated_file_path,
+    ) = find_translation_in_other_lang(
+        directory,
+        start_ms,
+        file_path,
+        lang_suffix,
+        other_lang_suffix,
+        index=index,
+    )
+
+    if translated_text:
+        translated_text = _clean_text(translated_text)
+        result["translation"] = {
+            "language": other_lang_suffix.upper(),
+            "file": translated_file_path,
+            "start_time": translated_start_time,
+            "end_time": translated_end_time,
+            "text": translated_text,
+        }
+    else:
+        result["translation"] = None
+
+    return result
+
+
+def _search_results(
+    directory, needle, lang_suffix, other_lang_suffix, index, executor, errors
+):
+    search_file = functools.partial(_search_file, needle, index=index)
+    file_paths = index["files"][lang_suffix]
+
+    # Only dispatch files whose trigrams can contain the query; files the
+    # index could not read are still scanned directly
+    trigram_files = index.get("trigram_files")
+    if trigram_files is not None and len(needle) >= TRIGRAM_SIZE:
+        text_paths, packed_postings = trigram_files
+        candidate_paths = {
+            text_paths[file_id]
+            for file_id in _trigram_candidates(packed_postings, needle)
+        }
+        text_index = index["text"]
+        file_paths = [
+            file_path
+            for file_path in file_paths
+            if file_path in candidate_paths or file_path not in text_index
+        ]
+
+    # Files are scanned concurrently but streamed back in index order
+    if executor is not None:
+        futures = [
+            executor.submit(search_file, file_path) for file_path in file_paths
+        ]
+        file_matches = (future.result() for future in futures)
     else:
-        formatted.append(f"No corresponding translation found.\n")
+        futures = []
+        file_matches = (search_file(file_path) for file_path in file_paths)
 
-    formatted.append("-" * 80)
-    return "\n".join(formatted)
+    count = 0
+    try:
+        for file_path, (loaded, positions) in zip(file_paths, file_matches):
+            if positions is None:
+                errors.append(file_path)
+                continue
 
+            # Translations are only looked up for matches that will be sent
+            for position in positions[: SEARCH_LIMIT - count]:
+                try:
+                    result = _build_result(
+                        directory,
+                        file_path,
+                        loaded,
+                        position,
+                        lang_suffix,
+                        other_lang_suffix,
+                        index,
+                    )
+                except Exception as e:
+                    print(f"Error processing file {file_path}: {e}")
+                    errors.append(file_path)
+                    break
+
+                count += 1
+                yield format_single_result(result).encode()
+
+            if count >= SEARCH_LIMIT:
+                return
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def stream_subtitle_search(
+    directory, search_string, conn, index=None, executor=None
+):
+    # Queries are matched as UTF-8 bytes against the per-file search blobs
+    if isinstance(search_string, str):
+        search_string = search_string.encode()
 
-def stream_subtitle_search(directory, search_string, conn):
     if is_russian(search_string):
         lang_suffix = "ru"
         other_lang_suffix = "en"
@@ -105,98 +712,80 @@ def stream_subtitle_search(directory, search_string, conn):
         lang_suffix = "en"
         other_lang_suffix = "ru"
 
-    found_matches = False
-    count = 0
+    if index is None:
+        index = build_subtitle_index(directory)
+
+    needle = _lower_utf8(search_string)
+
+    # Repeated queries against an unchanged index are answered from the cache
+    cache_key = None
+    if "generation" in index:
+        # The language comes from the raw query, and lowercasing can map a
+        # non-ASCII query onto an ASCII one, so it must be part of the key
+        cache_key = (directory, index["generation"], lang_suffix, needle)
+        with _RESULT_CACHE_LOCK:
+            response = _RESULT_CACHE.get(cache_key)
+            if response is not None:
+                _RESULT_CACHE.move_to_end(cache_key)
+        if response is not None:
+            if response:
+                conn.sendall(response)
+            return bool(response)
+
+    response = bytearray()
+    # Files that failed to read; a response missing them must not be cached
+    errors = []
+    # Results are batched so a search costs a few large sends, not one per match
+    send_buffer = bytearray()
+    try:
+        for formatted_result in _search_results(
+            directory, needle, lang_suffix, other_lang_suffix, index, executor, errors
+        ):
+            response += formatted_result
+            send_buffer += formatted_result
+            if len(send_buffer) >= SEND_BUFFER_SIZE:
+                conn.sendall(send_buffer)
+                send_buffer.clear()
+    finally:
+        if send_buffer:
+            conn.sendall(send_buffer)
 
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(f"_{lang_suffix}.srt"):
-                file_path = os.path.join(root, file)
-                try:
-                    subs = pysrt.open(file_path)
-                    for sub in subs:
-                        if (
-                            search_string.lower() in sub.text.lower()
-                        ):
-                            found_matches = True
-                            count += 1
-
-                            text = (
-                                re.sub(r"[ \n]+", " ", sub.text.strip())
-                                .replace("<i>", "")
-                                .replace("</i>", "")
-                            )
-
-                            result = {
-                                "original": {
-                                    "language": lang_suffix.upper(),
-                                    "file": file_path,
-                                    "start_time": str(sub.start),
-                                    "end_time": str(sub.end),
-                                    "text": text,
-                                }
-                            }
-
-                            (
-                                translated_text,
-                                translated_start_time,
-                                translated_end_time,
-                                translated_file_path,
-                            ) = find_translation_in_other_lang(
-                                directory,
-                                sub.start,
-                                file_path,
-                                lang_suffix,
-                                other_lang_suffix,
-                            )
-
-                            if translated_text:
-                                translated_text = (
-                                    re.sub(r"[ \n]+", " ", translated_text)
-                                    .strip()
-                                    .replace("<i>", "")
-                                    .replace("</i>", "")
-                                )
-                                result["translation"] = {
-                                    "language": other_lang_suffix.upper(),
-                                    "file": translated_file_path,
-                                    "start_time": str(translated_start_time),
-                                    "end_time": str(translated_end_time),
-                                    "text": translated_text,
-                                }
-                            else:
-                                result["translation"] = None
-
-                            formatted_result = format_single_result(result)
-                            conn.sendall(formatted_result.encode())
-
-                            if count >= SEARCH_LIMIT:
-                                return True
-                except Exception as e:
-                    print(f"Error processing file {file_path}: {e}")
+    if cache_key is not None and not errors:
+        with _RESULT_CACHE_LOCK:
+            _RESULT_CACHE[cache_key] = bytes(response)
+            _RESULT_CACHE.move_to_end(cache_key)
+            while len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+                _RESULT_CACHE.popitem(last=False)
 
-    return found_matches
+    return bool(response)
 
 
-def handle_client(conn, addr, subtitles_directory):
+def handle_client(
+    conn, addr, subtitles_directory, index=None, search_executor=None
+):
     print(f"[NEW CONNECTION] {addr} connected.")
     try:
+        # Each reply ends in one small write; don't let Nagle hold it back
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
         while True:
-            search_str = conn.recv(1024).decode().strip()
-            if not search_str:
+            query = conn.recv(1024).strip()
+            if not query:
                 break
 
-            print(f"[SEARCH] Client {addr} searching for: '{search_str}'")
+            print(
+                f"[SEARCH] Client {addr} searching for: "
+                f"'{query.decode(errors='replace')}'"
+            )
 
             found_matches = stream_subtitle_search(
-                subtitles_directory, search_str, conn
+                subtitles_directory, query, conn, index, search_executor
             )
 
             if not found_matches:
-                no_results_msg = "No matching subtitles found."
-                conn.sendall(no_results_msg.encode())
-
-            conn.sendall(b"\n<END>\n")
+                conn.sendall(b"No matching subtitles found.\n<END>\n")
+            else:
+                conn.sendall(b"\n<END>\n")
 
     except Exception as e:
         print(f"[ERROR] {e}")
@@ -213,16 +802,57 @@ def start_server(host, port, subtitles_directory):
     print(f"[LISTENING] Subtitle Search Server is listening on {host}:{port}")
     print(f"[DIRECTORY] Searching in: {subtitles_directory}")
 
+    text_index_path = os.path.join(subtitles_directory, TEXT_INDEX_FILE)
+    index = build_subtitle_index(
+        subtitles_directory,
+        {"text": load_text_index(text_index_path)},
+        with_text_index=True,
+    )
+    save_text_index(index["text"], text_index_path)
+    print(
+        "[INDEX] "
+        + ", ".join(
+            f"{len(paths)} {lang_suffix.upper()} files"
+            for lang_suffix, paths in index["files"].items()
+        )
+    )
+    threading.Thread(
+        target=_refresh_subtitle_index,
+        args=(index, subtitles_directory, INDEX_REFRESH_INTERVAL, text_index_path),
+        daemon=True,
+    ).start()
+    search_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    client_executor = ThreadPoolExecutor(max_workers=MAX_CLIENTS)
+    client_slots = threading.BoundedSemaphore(MAX_CLIENTS)
+
     try:
         while True:
             conn, addr = server.accept()
-            thread = threading.Thread(
-                target=handle_client, args=(conn, addr, subtitles_directory)
+
+            # Refuse clients past the cap rather than queueing them silently
+            if not client_slots.acquire(blocking=False):
+                print(f"[REJECTED] {addr}: too many connected clients.")
+                try:
+                    conn.sendall(b"Server is busy, try again later.\n<END>\n")
+                except OSError:
+                    pass
+                conn.close()
+                continue
+
+            future = client_executor.submit(
+                handle_client,
+                conn,
+                addr,
+                subtitles_directory,
+                index,
+                search_executor,
             )
-            thread.start()
+            future.add_done_callback(lambda _: client_slots.release())
     except KeyboardInterrupt:
         print("\n[SHUTTING DOWN] Server is shutting down...")
     finally:
+        client_executor.shutdown(wait=False, cancel_futures=True)
+        search_executor.shutdown(wait=False, cancel_futures=True)
         server.close()
 
 
@@ -241,10 +871,15 @@ def start_client(host, port):
             client.sendall(search_str.encode())
 
             receiving = True
+            server_closed = False
             buffer = ""
 
             while receiving:
                 data = client.recv(1024).decode()
+                if not data:
+                    # The server hung up, e.g. because it is at capacity
+                    server_closed = True
+                    break
                 if "<END>" in data:
                     buffer += data.replace("<END>", "")
                     receiving = False
@@ -260,8 +895,14 @@ def start_client(host, port):
             if buffer.strip():
                 print(colored(buffer, "cyan"))
 
+            if server_closed:
+                print("The server closed the connection.")
+                break
+
     except ConnectionRefusedError:
         print("Could not connect to the server. Make sure it's running.")
+    except (ConnectionResetError, BrokenPipeError):
+        print("Lost the connection to the server.")
     except KeyboardInterrupt:
         print("\nSearch cancelled.")
     finally: